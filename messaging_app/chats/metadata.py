@@ -0,0 +1,19 @@
+from rest_framework.metadata import SimpleMetadata
+
+
+class CachedSerializerMetadata(SimpleMetadata):
+    """
+    SimpleMetadata that caches serializer field descriptions per serializer class.
+    Permission checks still run on every OPTIONS request, since which actions are
+    listed depends on the requesting user; only the field introspection is reused.
+    """
+    _serializer_info_cache = {}
+    
+    def get_serializer_info(self, serializer):
+        """Return the cached field metadata for this serializer's class."""
+        if hasattr(serializer, 'child'):
+            serializer = serializer.child
+        cls = type(serializer)
+        if cls not in self._serializer_info_cache:
+            self._serializer_info_cache[cls] = super().get_serializer_info(serializer)
+        return self._serializer_info_cache[cls]
@@ -1,5 +1,11 @@
-from django.db import models
+from collections import Counter
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, QuerySet, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Left, Length
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import uuid
 
 class User(AbstractUser):
@@ -47,7 +53,7 @@ class Conversation(models.Model):
     default=uuid.uuid4,
     editable=False,
     help_text="Unique identified for the conversation"
-  ),
+  )
   participants = models.ManyToManyField(
     'User',
     related_name='conversations',
@@ -61,6 +67,34 @@ class Conversation(models.Model):
     auto_now=True,
     help_text="Timestamp when the conversation was last updated"
   )
+  last_message_id = models.UUIDField(
+    blank=True,
+    null=True,
+    help_text="Identifier of the most recent message"
+  )
+  last_message_body_preview = models.CharField(
+    max_length=103,
+    blank=True,
+    default='',
+    help_text="Truncated body of the most recent message"
+  )
+  last_message_sender = models.ForeignKey(
+    'User',
+    on_delete=models.SET_NULL,
+    blank=True,
+    null=True,
+    related_name='+',
+    help_text="Sender of the most recent message"
+  )
+  last_message_at = models.DateTimeField(
+    blank=True,
+    null=True,
+    help_text="Timestamp of the most recent message"
+  )
+  message_count = models.IntegerField(
+    default=0,
+    help_text="Number of messages in this conversation"
+  )
     
   class Meta:
     db_table = 'conversations'
@@ -69,9 +103,23 @@ class Conversation(models.Model):
     ordering = ['-updated_at']
     
   def __str__(self):
-    participant_names = ", ".join([user.username for user in self.participants.all()[:3]])
-    if self.participants.count() > 3:
-        participant_names += f" and {self.participants.count() - 3} others"
+    """
+    String representation listing up to three participants.
+    Uses prefetched participants when available, otherwise a single query,
+    and caches the result on the instance.
+    """
+    participant_names = getattr(self, '_participant_names', None)
+    if participant_names is None:
+      if 'participants' in getattr(self, '_prefetched_objects_cache', {}):
+        usernames = [user.username for user in self.participants.all()]
+        extra = f" and {len(usernames) - 3} others"
+      else:
+        usernames = list(self.participants.values_list('username', flat=True)[:4])
+        extra = " and others"
+      participant_names = ", ".join(usernames[:3])
+      if len(usernames) > 3:
+        participant_names += extra
+      self._participant_names = participant_names
     return f"Conversation: {participant_names}"
   
   @property
@@ -80,6 +128,23 @@ class Conversation(models.Model):
     return self.messages.order_by('-created_at').first()
 
 
+class MessageQuerySet(QuerySet):
+  """QuerySet for messages that keeps conversation counters in step with bulk deletes."""
+  
+  def delete(self):
+    """
+    Delete the messages, then recompute every affected conversation with one UPDATE.
+    """
+    with transaction.atomic():
+      conversation_ids = set(self.order_by().values_list('conversation_id', flat=True).distinct())
+      result = super().delete()
+      Message.refresh_conversations(conversation_ids)
+    return result
+  
+  delete.alters_data = True
+  delete.queryset_only = True
+
+
 class Message(models.Model):
   """
   Model for individual messages within conversations.
@@ -111,21 +176,148 @@ class Message(models.Model):
     help_text="Timestamp when the message was sent"
   )
   
+  objects = MessageQuerySet.as_manager()
+  
   class Meta:
     db_table = 'messages'
     verbose_name = 'Message'
     verbose_name_plural = 'Messages'
     ordering = ['-created_at']
+    indexes = [
+      # Deliberately not a covering index: INCLUDE (message_body) would copy unbounded
+      # text into the btree and fail inserts past PostgreSQL's index row size limit.
+      # Conversation lists read the denormalized last_message_* columns instead.
+      models.Index(fields=['conversation', '-created_at'], name='messages_conv_created_idx'),
+    ]
   
   def __str__(self):
     return f"Message from {self.sender.username} in {self.conversation.conversation_id}"
   
+  @property
+  def body_preview(self):
+    """Message body truncated to 100 characters for conversation listings."""
+    if len(self.message_body) > 100:
+      return self.message_body[:100] + '...'
+    return self.message_body
+  
+  def conversation_summary(self):
+    """Values for the conversation's denormalized last message columns."""
+    return {
+      'last_message_id': self.message_id,
+      'last_message_body_preview': self.body_preview,
+      'last_message_sender_id': self.sender_id,
+      'last_message_at': self.created_at,
+    }
+  
   def save(self, *args, **kwargs):
     """
     Override save method to update the conversation's updated_at timestamp
-    whenever a new message is added.
+    and last message summary whenever a new message is added.
+    """
+    adding = self._state.adding
+    # Keep the message row and the conversation's denormalized columns in step
+    with transaction.atomic():
+      super().save(*args, **kwargs)
+      if adding:
+        self.touch_conversation()
+      else:
+        # An edit only changes the summary if this is still the latest message
+        Conversation.objects.filter(
+          pk=self.conversation_id,
+          last_message_id=self.message_id
+        ).update(last_message_body_preview=self.body_preview, updated_at=timezone.now())
+  
+  def touch_conversation(self, added=1):
+    """
+    Count the `added` new messages on this message's conversation and record it
+    as the latest one unless a newer message is already recorded. Issues a single
+    UPDATE, without loading the conversation row.
+    """
+    # Compared in the UPDATE itself so that, when inserts race, an older message
+    # committing last cannot replace a newer summary
+    is_newer = (
+      Q(last_message_at__isnull=True) |
+      Q(last_message_at__lt=self.created_at) |
+      Q(last_message_at=self.created_at, last_message_id__lt=self.message_id)
+    )
+    summary = {
+      name: Case(When(is_newer, then=Value(value)), default=F(name))
+      for name, value in self.conversation_summary().items()
+    }
+    Conversation.objects.filter(pk=self.conversation_id).update(
+      # updated_at always moves forward since the message count changes either way
+      updated_at=timezone.now(),
+      message_count=F('message_count') + added,
+      **summary
+    )
+  
+  def delete(self, *args, **kwargs):
+    """
+    Delete the message and recompute its conversation's message count and
+    last message summary.
+    """
+    with transaction.atomic():
+      result = super().delete(*args, **kwargs)
+      Message.refresh_conversations([self.conversation_id])
+    return result
+  
+  @classmethod
+  def touch_conversations(cls, messages):
+    """
+    Record the latest of several bulk-created messages on each of their conversations.
+    bulk_create skips save(), so callers run this once afterwards.
+    """
+    latest = {message.conversation_id: message for message in messages}
+    added = Counter(message.conversation_id for message in messages)
+    for conversation_id, message in latest.items():
+      message.touch_conversation(added[conversation_id])
+  
+  @classmethod
+  def refresh_conversations(cls, conversation_ids):
     """
-    super().save(*args, **kwargs)
-    # Update the conversation's updated_at field
-    self.conversation.updated_at = self.created_at
-    self.conversation.save(update_fields=['updated_at'])
\ No newline at end of file
+    Recompute the message count and last message summary of the given conversations
+    from their remaining messages, with a single UPDATE however many were deleted.
+    Called after deletes instead of adjusting the counters message by message.
+    """
+    if not conversation_ids:
+      return
+    messages = cls.objects.filter(conversation_id=OuterRef('pk')).order_by()
+    latest = messages.order_by('-created_at', '-message_id').annotate(
+      body_length=Length('message_body'),
+      # Same truncation as body_preview
+      preview=Case(
+        When(body_length__gt=100, then=Concat(Left('message_body', 100), Value('...'))),
+        default=F('message_body'),
+        output_field=models.TextField()
+      )
+    )
+    Conversation.objects.filter(pk__in=conversation_ids).update(
+      updated_at=timezone.now(),
+      message_count=Coalesce(
+        Subquery(messages.values('conversation_id').annotate(total=Count('pk')).values('total')),
+        0
+      ),
+      last_message_id=Subquery(latest.values('message_id')[:1]),
+      last_message_body_preview=Coalesce(Subquery(latest.values('preview')[:1]), Value('')),
+      last_message_sender_id=Subquery(latest.values('sender_id')[:1]),
+      last_message_at=Subquery(latest.values('created_at')[:1]),
+    )
+
+
+@receiver(pre_delete, sender=User)
+def collect_conversations_on_user_delete(sender, instance, **kwargs):
+  """
+  Remember the conversations the user sent messages to before the cascade removes them.
+  """
+  instance._sent_conversation_ids = set(
+    Message.objects.filter(sender=instance).order_by().values_list('conversation_id', flat=True).distinct()
+  )
+
+
+@receiver(post_delete, sender=User)
+def refresh_conversations_on_user_delete(sender, instance, **kwargs):
+  """
+  Recompute counters on the conversations that lost the user's messages.
+  Messages are cascade-deleted in bulk without signals, so this is the only hook.
+  """
+  Message.refresh_conversations(getattr(instance, '_sent_conversation_ids', ()))
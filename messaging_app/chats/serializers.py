@@ -1,9 +1,92 @@
+import copy
+import serpy
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from .models import User, Conversation, Message
 
 
-class UserSerializer(serializers.ModelSerializer):
+class CachedFieldsMixin:
+    """
+    Caches the result of get_fields() per serializer class.
+    Each instance receives shallow copies instead of rebuilding and deep-copying every field.
+    """
+    _fields_cache = {}
+    
+    def get_fields(self):
+        """Return shallow copies of the cached fields for this serializer class."""
+        cls = type(self)
+        if cls not in self._fields_cache:
+            self._fields_cache[cls] = super().get_fields()
+        return {name: self.copy_field(field) for name, field in self._fields_cache[cls].items()}
+    
+    @staticmethod
+    def copy_field(field):
+        """
+        Shallow-copy a cached field. List fields and many-related fields get their own
+        copy of the child, bound to the new field, so nested serializers see this
+        instance's context and no state is shared between instances.
+        """
+        new = copy.copy(field)
+        for attr in ('child', 'child_relation'):
+            child = field.__dict__.get(attr)
+            if child is not None:
+                child = copy.deepcopy(child)
+                setattr(new, attr, child)
+                child.bind(field_name='', parent=new)
+        return new
+
+
+class CompiledRepresentationMixin:
+    """
+    Replaces to_representation with a function generated from the serializer's
+    readable fields the first time an instance of the class is rendered.
+    The generated code reads each attribute directly and builds the dict inline,
+    bypassing get_attribute and per-field dispatch. Intended for read-only
+    nested serializers whose fields map straight onto model attributes.
+    """
+    _representation_cache = {}
+    
+    def to_representation(self, instance):
+        """Render the instance with the compiled function for this serializer class."""
+        cls = type(self)
+        if cls not in self._representation_cache:
+            self._representation_cache[cls] = self.compile_representation()
+        compiled = self._representation_cache[cls]
+        if compiled is None:
+            return super().to_representation(instance)
+        return compiled(instance)
+    
+    def compile_representation(self):
+        """
+        Generate the specialized to_representation function.
+        Returns None when a field has a source that cannot be read as a plain attribute.
+        """
+        namespace = {}
+        lines = ['def to_representation(instance):']
+        items = []
+        for index, field in enumerate(self._readable_fields):
+            if len(field.source_attrs) != 1 or not field.source_attrs[0].isidentifier():
+                return None
+            value = f'value_{index}'
+            lines.append(f'    {value} = instance.{field.source_attrs[0]}')
+            if isinstance(field, serializers.CharField) or (
+                isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose'
+            ):
+                expression = f'str({value})'
+            else:
+                # Fields with their own formatting (e.g. datetimes) keep their to_representation
+                namespace[f'convert_{index}'] = field.to_representation
+                expression = f'convert_{index}({value})'
+            items.append(f'        {field.field_name!r}: None if {value} is None else {expression},')
+        lines.append('    return {')
+        lines.extend(items)
+        lines.append('    }')
+        exec('\n'.join(lines), namespace)
+        return namespace['to_representation']
+
+
+class UserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for User model.
     Handles user data serialization with read-only fields for security.
@@ -31,13 +114,75 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class NestedUserSerializer(CompiledRepresentationMixin, UserSerializer):
+    """
+    Read-only UserSerializer for users nested in message and conversation output.
+    Uses a compiled to_representation since nested users are rendered once per row.
+    """
+
+
+class UserListSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    """
+    Slim read-only User serializer for participants nested in list views.
+    Exposes only the columns loaded by the conversation list queryset.
+    """
+    user_id = serializers.UUIDField(read_only=True)
+    
+    class Meta:
+        model = User
+        fields = ['user_id', 'username', 'email', 'first_name', 'last_name']
+        read_only_fields = fields
+
+
+class MessageListSerializer(serializers.ListSerializer):
+    """
+    List serializer for batch message creation.
+    Resolves senders, conversations and memberships in bulk and inserts all messages at once.
+    """
+    
+    def create(self, validated_data):
+        """Create all messages with a fixed number of queries regardless of batch size."""
+        sender_ids = {item['sender_id'] for item in validated_data}
+        conversation_ids = {item['conversation_id'] for item in validated_data}
+        
+        senders = User.objects.in_bulk(sender_ids, field_name='user_id')
+        conversations = Conversation.objects.in_bulk(conversation_ids, field_name='conversation_id')
+        memberships = set(
+            Conversation.participants.through.objects.filter(
+                conversation_id__in=conversation_ids,
+                user_id__in=sender_ids
+            ).values_list('conversation_id', 'user_id')
+        )
+        
+        messages = []
+        for item in validated_data:
+            item = dict(item)
+            sender_id = item.pop('sender_id')
+            conversation_id = item.pop('conversation_id')
+            sender = senders.get(sender_id)
+            conversation = conversations.get(conversation_id)
+            if sender is None or conversation is None:
+                raise serializers.ValidationError("Invalid sender or conversation")
+            
+            # Verify sender is a participant in the conversation
+            if (conversation.pk, sender_id) not in memberships:
+                raise serializers.ValidationError("Sender must be a participant in the conversation")
+            
+            messages.append(Message(sender=sender, conversation=conversation, **item))
+        
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            Message.touch_conversations(messages)
+        return messages
+
+
+class MessageSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Message model.
     Handles message data with nested sender information.
     """
     message_id = serializers.UUIDField(read_only=True)
-    sender = UserSerializer(read_only=True)
+    sender = NestedUserSerializer(read_only=True)
     sender_id = serializers.UUIDField(write_only=True)
     conversation_id = serializers.UUIDField(write_only=True)
     
@@ -48,6 +193,18 @@ class MessageSerializer(serializers.ModelSerializer):
             'message_body', 'created_at'
         ]
         read_only_fields = ['message_id', 'created_at', 'sender']
+        list_serializer_class = MessageListSerializer
+    
+    def validate(self, attrs):
+        """
+        Reject moving an existing message to another conversation or sender,
+        which would leave both conversations' denormalized columns stale.
+        """
+        if self.instance is not None:
+            for field in ('conversation_id', 'sender_id'):
+                if field in attrs and attrs[field] != getattr(self.instance, field):
+                    raise serializers.ValidationError({field: "Cannot be changed once a message is sent"})
+        return attrs
     
     def create(self, validated_data):
         """Create message with proper sender and conversation assignment."""
@@ -72,13 +229,13 @@ class MessageSerializer(serializers.ModelSerializer):
         return message
 
 
-class ConversationSerializer(serializers.ModelSerializer):
+class ConversationSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Conversation model.
     Handles conversation data with nested participants and messages.
     """
     conversation_id = serializers.UUIDField(read_only=True)
-    participants = UserSerializer(many=True, read_only=True)
+    participants = NestedUserSerializer(many=True, read_only=True)
     participant_ids = serializers.ListField(
         child=serializers.UUIDField(),
         write_only=True,
@@ -105,21 +262,27 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
     
     def get_message_count(self, obj):
-        """Get total number of messages in the conversation."""
-        return obj.messages.count()
+        """Get total number of messages from the denormalized message_count column."""
+        return obj.message_count
     
     def create(self, validated_data):
         """Create conversation with specified participants."""
         participant_ids = validated_data.pop('participant_ids')
         
-        # Validate that all participant IDs exist
-        participants = User.objects.filter(user_id__in=participant_ids)
-        if len(participants) != len(participant_ids):
+        # Validate that all participant IDs exist without loading the users
+        existing = set(
+            User.objects.filter(user_id__in=participant_ids).order_by().values_list('user_id', flat=True)
+        )
+        if len(existing) != len(participant_ids):
             raise serializers.ValidationError("One or more participant IDs are invalid")
         
-        # Create conversation
+        # Create conversation and add all participants with a single INSERT
         conversation = Conversation.objects.create(**validated_data)
-        conversation.participants.set(participants)
+        through = Conversation.participants.through
+        through.objects.bulk_create([
+            through(conversation_id=conversation.pk, user_id=user_id)
+            for user_id in existing
+        ])
         
         return conversation
     
@@ -134,13 +297,13 @@ class ConversationSerializer(serializers.ModelSerializer):
         return value
 
 
-class ConversationListSerializer(serializers.ModelSerializer):
+class ConversationListSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     """
     Simplified serializer for listing conversations without nested messages.
     Used for performance optimization in list views.
     """
     conversation_id = serializers.UUIDField(read_only=True)
-    participants = UserSerializer(many=True, read_only=True)
+    participants = UserListSerializer(many=True, read_only=True)
     last_message = serializers.SerializerMethodField()
     message_count = serializers.SerializerMethodField()
     
@@ -154,16 +317,92 @@ class ConversationListSerializer(serializers.ModelSerializer):
     
     def get_last_message(self, obj):
         """Get the most recent message in the conversation."""
-        last_msg = obj.last_message
-        if last_msg:
-            return {
-                'message_id': last_msg.message_id,
-                'sender': last_msg.sender.username,
-                'message_body': last_msg.message_body[:100] + '...' if len(last_msg.message_body) > 100 else last_msg.message_body,
-                'created_at': last_msg.created_at
-            }
-        return None
+        return last_message_preview(obj)
     
     def get_message_count(self, obj):
-        """Get total number of messages in the conversation."""
-        return obj.messages.count()
\ No newline at end of file
+        """Get total number of messages from the denormalized message_count column."""
+        return obj.message_count
+
+
+def last_message_preview(conversation):
+    """
+    Build the truncated last message summary for a conversation.
+    Reads the denormalized last_message_* columns maintained by Message.save.
+    """
+    if conversation.last_message_id is None:
+        return None
+    sender = conversation.last_message_sender
+    return {
+        'message_id': conversation.last_message_id,
+        'sender': sender.username if sender else None,
+        'message_body': conversation.last_message_body_preview,
+        'created_at': conversation.last_message_at
+    }
+
+
+class FastUserListSerializer(serpy.Serializer):
+    """
+    Read-only serpy serializer producing the same output as UserListSerializer.
+    Used on list endpoints where DRF field machinery dominates response time.
+    """
+    user_id = serpy.StrField()
+    username = serpy.Field()
+    email = serpy.Field()
+    first_name = serpy.Field()
+    last_name = serpy.Field()
+
+
+class FastUserSerializer(FastUserListSerializer):
+    """
+    Read-only serpy serializer producing the same output as UserSerializer.
+    """
+    phone_number = serpy.Field()
+    created_at = serpy.Field()
+    updated_at = serpy.Field()
+
+
+class FastMessageSerializer(serpy.Serializer):
+    """
+    Read-only serpy serializer producing the same output as MessageSerializer.
+    """
+    message_id = serpy.StrField()
+    sender = FastUserSerializer()
+    message_body = serpy.Field()
+    created_at = serpy.Field()
+
+
+class FastConversationListSerializer(serpy.Serializer):
+    """
+    Read-only serpy serializer producing the same output as ConversationListSerializer.
+    """
+    conversation_id = serpy.StrField()
+    participants = FastUserListSerializer(attr='participants.all', call=True, many=True)
+    last_message = serpy.MethodField()
+    message_count = serpy.Field()
+    created_at = serpy.Field()
+    updated_at = serpy.Field()
+    
+    def get_last_message(self, obj):
+        """Get the most recent message in the conversation."""
+        return last_message_preview(obj)
+
+
+class FastConversationSerializer(serpy.Serializer):
+    """
+    Read-only serpy serializer producing the same output as ConversationSerializer.
+    Expects participants and messages (with senders) to be prefetched.
+    """
+    conversation_id = serpy.StrField()
+    participants = FastUserSerializer(attr='participants.all', call=True, many=True)
+    messages = FastMessageSerializer(attr='messages.all', call=True, many=True)
+    last_message = serpy.MethodField()
+    message_count = serpy.Field()
+    created_at = serpy.Field()
+    updated_at = serpy.Field()
+    
+    def get_last_message(self, obj):
+        """Get the most recent message from the prefetched, newest-first messages."""
+        messages = obj.messages.all()
+        if messages:
+            return FastMessageSerializer(messages[0]).data
+        return None
@@ -1,3 +1,298 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import User, Conversation, Message
+from .renderers import ORJSONRenderer
+from .serializers import ConversationSerializer, MessageSerializer
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    """Tests for the orjson-backed renderer."""
+    
+    def test_renders_int_keyed_error_dict(self):
+        """ListField validation errors are keyed by item index and must still render."""
+        data = {
+            'participant_ids': {
+                0: [ErrorDetail('Must be a valid UUID.', code='invalid')],
+                1: [ErrorDetail('Must be a valid UUID.', code='invalid')],
+            }
+        }
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, JSONRenderer().render(data))
+        self.assertIn(b'"0":', rendered)
+
+
+class CachedFieldsMixinTests(SimpleTestCase):
+    """Tests for the per-class serializer field cache."""
+    
+    def test_nested_children_are_bound_per_instance(self):
+        """Children of list fields belong to each instance and see its context."""
+        first = ConversationSerializer(context={'request': 'first'})
+        second = ConversationSerializer(context={'request': 'second'})
+        
+        for name in ('participants', 'messages', 'participant_ids'):
+            field = first.fields[name]
+            self.assertIsNot(field.child, second.fields[name].child)
+            self.assertIs(field.child.parent, field)
+        
+        self.assertEqual(first.fields['participants'].child.context, {'request': 'first'})
+        self.assertEqual(second.fields['messages'].child.context, {'request': 'second'})
+        self.assertEqual(
+            second.fields['messages'].child.fields['sender'].context,
+            {'request': 'second'}
+        )
+
+
+class ConversationTestCase(TestCase):
+    """Base test case with two users sharing a conversation and an authenticated client."""
+    
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='secret')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='secret')
+        self.conversation = self.create_conversation(self.alice, self.bob)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+    
+    def create_conversation(self, *participants):
+        conversation = Conversation.objects.create()
+        conversation.participants.add(*participants)
+        return conversation
+    
+    def assertConversationState(self, conversation, count, last_message):
+        """Assert the denormalized columns match the given count and latest message."""
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.message_count, count)
+        self.assertEqual(conversation.messages.count(), count)
+        if last_message is None:
+            self.assertIsNone(conversation.last_message_id)
+            self.assertIsNone(conversation.last_message_at)
+        else:
+            last_message.refresh_from_db()
+            self.assertEqual(conversation.last_message_id, last_message.message_id)
+            self.assertEqual(conversation.last_message_sender_id, last_message.sender_id)
+            self.assertEqual(conversation.last_message_at, last_message.created_at)
+            self.assertEqual(conversation.last_message_body_preview, last_message.body_preview)
+
+
+class MessageUpdateTests(ConversationTestCase):
+    """Tests for editing messages and racing message inserts."""
+    
+    def test_conversation_and_sender_cannot_change(self):
+        """Moving a message would leave both conversations' counters stale."""
+        message = Message.objects.create(sender=self.alice, conversation=self.conversation, message_body='hi')
+        other = self.create_conversation(self.alice, self.bob)
+        
+        for field, value in (('conversation_id', other.pk), ('sender_id', self.bob.pk)):
+            response = self.client.patch(
+                f'/api/messages/{message.message_id}/', {field: str(value)}, format='json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, response.json())
+        
+        self.assertConversationState(self.conversation, 1, message)
+        self.assertConversationState(other, 0, None)
+    
+    def test_edit_keeps_conversation(self):
+        message = Message.objects.create(sender=self.alice, conversation=self.conversation, message_body='hi')
+        response = self.client.patch(
+            f'/api/messages/{message.message_id}/',
+            {'conversation_id': str(self.conversation.pk), 'message_body': 'edited'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConversationState(self.conversation, 1, message)
+        self.assertEqual(self.conversation.last_message_body_preview, 'edited')
+    
+    def test_older_message_does_not_replace_newer_summary(self):
+        """An insert that commits after a newer one only bumps the count."""
+        newer = Message.objects.create(sender=self.alice, conversation=self.conversation, message_body='newer')
+        older = Message(
+            sender=self.bob,
+            conversation=self.conversation,
+            message_body='older',
+            created_at=newer.created_at - timedelta(seconds=1)
+        )
+        older.touch_conversation()
+        
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 2)
+        self.assertEqual(self.conversation.last_message_id, newer.message_id)
+        self.assertEqual(self.conversation.last_message_body_preview, 'newer')
+
+
+class MessageDeleteTests(ConversationTestCase):
+    """Tests for keeping conversation counters in step with deletes."""
+    
+    def setUp(self):
+        super().setUp()
+        self.other = self.create_conversation(self.alice, self.bob)
+        self.messages = [
+            Message.objects.create(
+                sender=(self.alice, self.bob)[index % 2],
+                conversation=(self.conversation, self.other)[index % 2],
+                message_body='x' * (98 + index)
+            )
+            for index in range(6)
+        ]
+    
+    def test_delete_latest_message(self):
+        self.messages[4].delete()
+        self.assertConversationState(self.conversation, 2, self.messages[2])
+        self.assertConversationState(self.other, 3, self.messages[5])
+    
+    def test_delete_older_message(self):
+        self.messages[0].delete()
+        self.assertConversationState(self.conversation, 2, self.messages[4])
+    
+    def test_delete_through_api(self):
+        response = self.client.delete(f'/api/messages/{self.messages[4].message_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertConversationState(self.conversation, 2, self.messages[2])
+    
+    def test_queryset_delete(self):
+        """One SELECT and one UPDATE cover every affected conversation."""
+        with self.assertNumQueries(5):
+            Message.objects.filter(message_id__in=[self.messages[4].pk, self.messages[5].pk]).delete()
+        self.assertConversationState(self.conversation, 2, self.messages[2])
+        self.assertConversationState(self.other, 2, self.messages[3])
+        
+        self.conversation.messages.all().delete()
+        self.assertConversationState(self.conversation, 0, None)
+        self.assertEqual(self.conversation.last_message_body_preview, '')
+    
+    def test_user_delete_cascade(self):
+        """The sender's messages are removed in bulk and their conversations recomputed."""
+        for index in range(20):
+            Message.objects.create(sender=self.bob, conversation=self.other, message_body='more')
+        with self.assertNumQueries(9):
+            self.bob.delete()
+        self.assertConversationState(self.conversation, 3, self.messages[4])
+        self.assertConversationState(self.other, 0, None)
+        self.assertIsNone(self.other.last_message_sender_id)
+    
+    def test_conversation_delete_cascade(self):
+        self.conversation.delete()
+        self.assertFalse(Message.objects.filter(conversation_id=self.conversation.pk).exists())
+        self.assertConversationState(self.other, 3, self.messages[5])
+
+
+class MessageCreateTests(ConversationTestCase):
+    """Tests for the conversation counters on every message insert path."""
+    
+    def test_send_message(self):
+        response = self.client.post('/api/messages/send_message/', {
+            'conversation_id': str(self.conversation.pk),
+            'message_body': 'y' * 150
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get(message_id=response.json()['message_id'])
+        self.assertConversationState(self.conversation, 1, message)
+        self.assertEqual(self.conversation.last_message_body_preview, 'y' * 100 + '...')
+    
+    def test_send_messages(self):
+        other = self.create_conversation(self.alice, self.bob)
+        response = self.client.post('/api/messages/send_messages/', [
+            {'conversation_id': str(self.conversation.pk), 'message_body': 'one'},
+            {'conversation_id': str(other.pk), 'message_body': 'two'},
+            {'conversation_id': str(self.conversation.pk), 'message_body': 'three'},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertConversationState(self.conversation, 2, Message.objects.get(message_body='three'))
+        self.assertConversationState(other, 1, Message.objects.get(message_body='two'))
+    
+    def test_send_messages_rejects_invalid_batch_without_inserting(self):
+        response = self.client.post('/api/messages/send_messages/', [
+            {'conversation_id': str(self.conversation.pk), 'message_body': 'one'},
+            {'conversation_id': str(self.conversation.pk), 'message_body': 42},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertConversationState(self.conversation, 0, None)
+    
+    def test_message_list_serializer(self):
+        serializer = MessageSerializer(data=[
+            {'sender_id': self.alice.pk, 'conversation_id': self.conversation.pk, 'message_body': 'one'},
+            {'sender_id': self.bob.pk, 'conversation_id': self.conversation.pk, 'message_body': 'two'},
+        ], many=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        messages = serializer.save()
+        self.assertConversationState(self.conversation, 2, messages[-1])
+
+
+class ByConversationTests(ConversationTestCase):
+    """Tests for keyset pagination of a conversation's messages."""
+    
+    def fetch(self, **params):
+        params.setdefault('conversation_id', str(self.conversation.pk))
+        return self.client.get('/api/messages/by_conversation/', params)
+    
+    def test_pages_through_messages_sharing_a_timestamp(self):
+        """Rows tied on created_at are ordered by message_id, so none is skipped or repeated."""
+        for index in range(4):
+            Message.objects.create(sender=self.alice, conversation=self.conversation, message_body=str(index))
+        Message.objects.update(created_at=self.conversation.created_at)
+        
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            response = self.fetch(**params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), 2)
+            seen.extend(message['message_id'] for message in page['results'])
+            cursor = page['next']
+            if cursor is None:
+                break
+        
+        expected = sorted((str(message.pk) for message in Message.objects.all()), reverse=True)
+        self.assertEqual(seen, expected)
+    
+    def test_invalid_cursor(self):
+        response = self.fetch(cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_requires_participation(self):
+        carol = User.objects.create_user(username='carol', email='carol@example.com', password='secret')
+        self.client.force_authenticate(carol)
+        self.assertEqual(self.fetch().status_code, 403)
+
+
+class ConversationListCacheTests(ConversationTestCase):
+    """Tests for invalidating the cached conversation list."""
+    
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.carol = User.objects.create_user(username='carol', email='carol@example.com', password='secret')
+    
+    def participant_names(self):
+        response = self.client.get('/api/conversations/')
+        self.assertEqual(response.status_code, 200)
+        [conversation] = response.json()
+        return sorted(user['username'] for user in conversation['participants'])
+    
+    def test_add_and_remove_participant(self):
+        self.assertEqual(self.participant_names(), ['alice', 'bob'])
+        
+        url = f'/api/conversations/{self.conversation.pk}/'
+        response = self.client.post(url + 'add_participant/', {'participant_id': str(self.carol.pk)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.participant_names(), ['alice', 'bob', 'carol'])
+        
+        response = self.client.post(url + 'remove_participant/', {'participant_id': str(self.carol.pk)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.participant_names(), ['alice', 'bob'])
+    
+    def test_new_message(self):
+        self.assertIsNone(self.client.get('/api/conversations/').json()[0]['last_message'])
+        Message.objects.create(sender=self.bob, conversation=self.conversation, message_body='hi')
+        conversation = self.client.get('/api/conversations/').json()[0]
+        self.assertEqual(conversation['message_count'], 1)
+        self.assertEqual(conversation['last_message']['message_body'], 'hi')
@@ -24,5 +24,6 @@ urlpatterns = [
 # /conversations/{conversation_id}/remove_participant/ - POST (custom action)
 # /messages/ - GET (list), POST (create)
 # /messages/{message_id}/ - GET (retrieve), PUT (update), PATCH (partial_update), DELETE (destroy)
-# /messages/by_conversation/ - GET (custom action)
-# /messages/send_message/ - POST (custom action)
\ No newline at end of file
+# /messages/by_conversation/ - GET (custom action, keyset paginated with ?cursor=&limit=)
+# /messages/send_message/ - POST (custom action)
+# /messages/send_messages/ - POST (custom action)
\ No newline at end of file
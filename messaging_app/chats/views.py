@@ -1,14 +1,58 @@
+import base64
+import binascii
+import uuid
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.cache import cache
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
+from django.db.models import Q, Count, Exists, Max, OuterRef, Prefetch
 from .models import User, Conversation, Message
 from .serializers import (
     UserSerializer, ConversationSerializer, ConversationListSerializer,
-    MessageSerializer
+    MessageSerializer, FastConversationSerializer, FastConversationListSerializer,
+    FastMessageSerializer
 )
 
+def participant_exists(user, conversation_ref='pk'):
+    """
+    Exists() subquery matching rows whose conversation the user participates in.
+    Used instead of joining participants, which needs .distinct() to dedupe rows.
+    """
+    return Exists(
+        Conversation.participants.through.objects.filter(
+            conversation_id=OuterRef(conversation_ref),
+            user_id=user.pk
+        )
+    )
+
+
+def encode_message_cursor(message):
+    """
+    Encode a message's (created_at, message_id) position as an opaque, URL-safe cursor.
+    """
+    raw = f"{message.created_at.isoformat()}|{message.message_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_message_cursor(cursor):
+    """
+    Decode a cursor from encode_message_cursor into (created_at, message_id).
+    Returns None when the cursor is malformed.
+    """
+    try:
+        created_at, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        message_id = uuid.UUID(message_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, message_id
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     ViewSet for User operations.
@@ -19,17 +63,18 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'user_id'
     
+    # Permission classes keep no per-request state, so one instance is shared
+    create_permissions = (permissions.AllowAny(),)
+    default_permissions = (permissions.IsAuthenticated(),)
+    
     def get_permissions(self):
         """
-        Instantiates and returns the list of permissions that this view requires.
+        Returns the permissions that this view requires.
         Allow user creation without authentication.
         """
         if self.action == 'create':
-            permission_classes = [permissions.AllowAny]
-        else:
-            permission_classes = [permissions.IsAuthenticated]
-        
-        return [permission() for permission in permission_classes]
+            return self.create_permissions
+        return self.default_permissions
 
 
 class ConversationViewSet(viewsets.ModelViewSet):
@@ -41,6 +86,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
     serializer_class = ConversationSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'conversation_id'
+    list_cache_timeout = 300
     
     def get_serializer_class(self):
         """
@@ -54,11 +100,60 @@ class ConversationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Filter conversations to only show those the authenticated user participates in.
+        The list view loads only the columns its serializer renders and reads the
+        denormalized last message columns instead of loading messages; every
+        other action gets the full message set.
         """
         user = self.request.user
-        return Conversation.objects.filter(
-            participants=user
-        ).prefetch_related('participants', 'messages').distinct()
+        queryset = Conversation.objects.filter(participant_exists(user))
+        
+        if self.action == 'list':
+            return queryset.select_related('last_message_sender').only(
+                'created_at', 'updated_at', 'last_message_id',
+                'last_message_body_preview', 'last_message_at', 'message_count',
+                'last_message_sender__username'
+            ).prefetch_related(
+                Prefetch(
+                    'participants',
+                    queryset=User.objects.only(
+                        'user_id', 'username', 'email', 'first_name', 'last_name'
+                    )
+                )
+            )
+        return queryset.prefetch_related(
+            'participants',
+            Prefetch('messages', queryset=Message.objects.select_related('sender'))
+        )
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List the user's conversations through the serpy fast path,
+        skipping DRF field binding for every row.
+        The serialized list is cached per user, keyed on the latest updated_at and the
+        number of conversations, so any message or membership change yields a new key.
+        """
+        state = Conversation.objects.filter(participant_exists(request.user)).aggregate(
+            latest=Max('updated_at'),
+            total=Count('pk')
+        )
+        latest = state['latest'].timestamp() if state['latest'] else 0
+        cache_key = f"convlist:{request.user.pk}:{latest}:{state['total']}"
+        
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            data = FastConversationListSerializer(queryset, many=True).data
+            cache.set(cache_key, data, self.list_cache_timeout)
+        return Response(data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retrieve a conversation with its participants and messages through
+        the serpy fast path, skipping DRF field binding for every nested object.
+        """
+        conversation = self.get_object()
+        serializer = FastConversationSerializer(conversation)
+        return Response(serializer.data)
     
     def perform_create(self, serializer):
         """
@@ -66,7 +161,7 @@ class ConversationViewSet(viewsets.ModelViewSet):
         """
         conversation = serializer.save()
         # Add current user as a participant if not already included
-        if not conversation.participants.filter(user_id=self.request.user.user_id).exists():
+        if self.request.user.user_id not in serializer.validated_data['participant_ids']:
             conversation.participants.add(self.request.user)
     
     @action(detail=True, methods=['post'])
@@ -91,13 +186,17 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        if conversation.participants.filter(user_id=participant_id).exists():
+        # Membership is checked against the participants prefetched by get_queryset
+        participant_ids = {user.user_id for user in conversation.participants.all()}
+        if participant.user_id in participant_ids:
             return Response(
                 {'error': 'User is already a participant'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         conversation.participants.add(participant)
+        # Bump updated_at so cached conversation lists pick up the new participant
+        conversation.save(update_fields=['updated_at'])
         serializer = self.get_serializer(conversation)
         return Response(serializer.data)
     
@@ -123,20 +222,24 @@ class ConversationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        if not conversation.participants.filter(user_id=participant_id).exists():
+        # Membership is checked against the participants prefetched by get_queryset
+        participant_ids = {user.user_id for user in conversation.participants.all()}
+        if participant.user_id not in participant_ids:
             return Response(
                 {'error': 'User is not a participant'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         # Prevent removing the last participant
-        if conversation.participants.count() <= 2:
+        if len(participant_ids) <= 2:
             return Response(
                 {'error': 'Cannot remove participant. Conversation must have at least 2 participants'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
         conversation.participants.remove(participant)
+        # Bump updated_at so cached conversation lists drop the removed participant
+        conversation.save(update_fields=['updated_at'])
         serializer = self.get_serializer(conversation)
         return Response(serializer.data)
 
@@ -150,6 +253,9 @@ class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = 'message_id'
+    by_conversation_page_size = 50
+    by_conversation_max_page_size = 200
+    send_messages_max_batch_size = 100
     
     def get_queryset(self):
         """
@@ -157,8 +263,17 @@ class MessageViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         return Message.objects.filter(
-            conversation__participants=user
-        ).select_related('sender', 'conversation').distinct()
+            participant_exists(user, 'conversation_id')
+        ).select_related('sender', 'conversation')
+    
+    def get_conversation(self, conversation_id):
+        """
+        Fetch a conversation annotated with whether the current user participates in it.
+        Resolves both existence and membership in a single query.
+        """
+        return Conversation.objects.annotate(
+            is_participant=participant_exists(self.request.user)
+        ).get(conversation_id=conversation_id)
     
     def perform_create(self, serializer):
         """
@@ -169,8 +284,8 @@ class MessageViewSet(viewsets.ModelViewSet):
         
         # Verify user is participant in the conversation
         try:
-            conversation = Conversation.objects.get(conversation_id=conversation_id)
-            if not conversation.participants.filter(user_id=self.request.user.user_id).exists():
+            conversation = self.get_conversation(conversation_id)
+            if not conversation.is_participant:
                 raise PermissionError("You are not a participant in this conversation")
         except Conversation.DoesNotExist:
             raise ValueError("Conversation not found")
@@ -180,7 +295,10 @@ class MessageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_conversation(self, request):
         """
-        Get all messages for a specific conversation.
+        Get messages for a specific conversation, newest first, using keyset pagination.
+        Pass the returned `next` value as `cursor` to fetch the following page of older
+        messages; `limit` controls the page size. Pages are keyed on
+        (created_at, message_id) so messages sharing a timestamp are never skipped.
         """
         conversation_id = request.query_params.get('conversation_id')
         
@@ -191,7 +309,25 @@ class MessageViewSet(viewsets.ModelViewSet):
             )
         
         try:
-            conversation = Conversation.objects.get(conversation_id=conversation_id)
+            limit = int(request.query_params.get('limit', self.by_conversation_page_size))
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, self.by_conversation_max_page_size))
+        
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            cursor = decode_message_cursor(cursor)
+            if cursor is None:
+                return Response(
+                    {'error': 'Invalid cursor'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
+        try:
+            conversation = self.get_conversation(conversation_id)
         except Conversation.DoesNotExist:
             return Response(
                 {'error': 'Conversation not found'},
@@ -199,18 +335,32 @@ class MessageViewSet(viewsets.ModelViewSet):
             )
         
         # Check if user is a participant
-        if not conversation.participants.filter(user_id=request.user.user_id).exists():
+        if not conversation.is_participant:
             return Response(
                 {'error': 'You are not a participant in this conversation'},
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        messages = Message.objects.filter(
-            conversation=conversation
-        ).select_related('sender').order_by('created_at')
+        messages = Message.objects.filter(conversation=conversation)
+        if cursor:
+            created_at, message_id = cursor
+            messages = messages.filter(
+                Q(created_at__lt=created_at) |
+                Q(created_at=created_at, message_id__lt=message_id)
+            )
+        
+        # Fetch one extra row to know whether another page exists
+        page = list(
+            messages.select_related('sender').order_by('-created_at', '-message_id')[:limit + 1]
+        )
+        has_next = len(page) > limit
+        page = page[:limit]
         
-        serializer = self.get_serializer(messages, many=True)
-        return Response(serializer.data)
+        serializer = FastMessageSerializer(page, many=True)
+        return Response({
+            'results': serializer.data,
+            'next': encode_message_cursor(page[-1]) if has_next else None
+        })
     
     @action(detail=False, methods=['post'])
     def send_message(self, request):
@@ -227,8 +377,14 @@ class MessageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if not isinstance(message_body, str):
+            return Response(
+                {'error': 'message_body must be a string'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
-            conversation = Conversation.objects.get(conversation_id=conversation_id)
+            conversation = self.get_conversation(conversation_id)
         except Conversation.DoesNotExist:
             return Response(
                 {'error': 'Conversation not found'},
@@ -236,7 +392,7 @@ class MessageViewSet(viewsets.ModelViewSet):
             )
         
         # Check if user is a participant
-        if not conversation.participants.filter(user_id=request.user.user_id).exists():
+        if not conversation.is_participant:
             return Response(
                 {'error': 'You are not a participant in this conversation'},
                 status=status.HTTP_403_FORBIDDEN
@@ -250,4 +406,75 @@ class MessageViewSet(viewsets.ModelViewSet):
         )
         
         serializer = self.get_serializer(message)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'])
+    def send_messages(self, request):
+        """
+        Send several messages in a single request.
+        Expects a list of objects with conversation_id and message_body;
+        all messages are inserted with one bulk query.
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'error': 'A non-empty list of messages is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > self.send_messages_max_batch_size:
+            return Response(
+                {'error': f'At most {self.send_messages_max_batch_size} messages can be sent at once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not all(
+            isinstance(item, dict) and item.get('conversation_id') and item.get('message_body')
+            for item in items
+        ):
+            return Response(
+                {'error': 'conversation_id and message_body are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not all(isinstance(item['message_body'], str) for item in items):
+            return Response(
+                {'error': 'message_body must be a string'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            pending = [
+                (uuid.UUID(str(item['conversation_id'])), item['message_body'])
+                for item in items
+            ]
+        except ValueError:
+            return Response(
+                {'error': 'Invalid conversation_id'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Check participation in every conversation with a single query
+        conversation_ids = {conversation_id for conversation_id, _ in pending}
+        allowed = set(
+            Conversation.objects.filter(
+                participant_exists(request.user),
+                conversation_id__in=conversation_ids
+            ).values_list('conversation_id', flat=True)
+        )
+        if allowed != conversation_ids:
+            return Response(
+                {'error': 'You are not a participant in one or more of these conversations'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # Insert the messages and update their conversations as one unit
+        with transaction.atomic():
+            messages = Message.objects.bulk_create([
+                Message(sender=request.user, conversation_id=conversation_id, message_body=message_body)
+                for conversation_id, message_body in pending
+            ])
+            Message.touch_conversations(messages)
+        
+        serializer = FastMessageSerializer(messages, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)